@@ -1,8 +1,9 @@
+import asyncio
 import mcp.server.stdio
 import mcp.types as types
 from mcp.server import NotificationOptions, Server
 from mcp.server.models import InitializationOptions
-from typing import Dict, Type
+from typing import Dict
 
 from repl.tools import PythonTool, PythonSessionTool, ShellTool, PerlTool
 from repl.tools.base import BaseTool
@@ -12,38 +13,33 @@ from repl.tools.shell_status_tool import ShellStatusTool
 class ReplServer(Server):
     def __init__(self):
         super().__init__("repl")
-        # Initialize all tools
-        self.tools: Dict[str, BaseTool] = {}
 
-        # Create shell tool first since status tool needs reference to it
-        self.shell_tool = ShellTool()
-        self.tools[self.shell_tool.name] = self.shell_tool
-        self.tools["shell_status"] = ShellStatusTool(self.shell_tool)
-
-        # Add other tools
-        for tool_class in self._get_tool_classes():
-            if tool_class != ShellTool:  # Skip ShellTool since we already created it
-                tool = tool_class()
-                self.tools[tool.name] = tool
+        # Status tool needs a reference to the shell tool whose tasks it reports on
+        shell_tool = ShellTool()
+        tools: list[BaseTool] = [
+            shell_tool,
+            ShellStatusTool(shell_tool),
+            PythonTool(),
+            PythonSessionTool(),
+            PerlTool(),
+        ]
+        self.tools: Dict[str, BaseTool] = {tool.name: tool for tool in tools}
+        self.shell_tool = shell_tool
 
-        self.initialize()
+        # Resolve lifecycle hooks once rather than probing every tool on each call
+        self._initializable = [tool for tool in self.tools.values() if hasattr(tool, 'initialize')]
+        self._shutdownable = [tool for tool in self.tools.values() if hasattr(tool, 'shutdown')]
 
-    @staticmethod
-    def _get_tool_classes() -> list[Type[BaseTool]]:
-        """Get all available tool classes"""
-        return [
-            PythonTool,
-            PythonSessionTool,
-            ShellTool,
-            PerlTool,
-        ]
+        # Tool definitions are static, so build the list_tools response once
+        self.tool_definitions: list[types.Tool] = [tool.get_tool_definition() for tool in self.tools.values()]
 
     async def initialize(self):
         """Initialize the server and all tools"""
-        # Initialize any tools that need it
-        for tool in self.tools.values():
-            if hasattr(tool, 'initialize'):
-                await tool.initialize()
+        await asyncio.gather(*(tool.initialize() for tool in self._initializable))
+
+    async def shutdown(self):
+        """Shut down all tools"""
+        await asyncio.gather(*(tool.shutdown() for tool in self._shutdownable))
 
 
 async def main():
@@ -53,7 +49,7 @@ async def main():
     @server.list_tools()
     async def handle_list_tools() -> list[types.Tool]:
         """List available tools"""
-        return [tool.get_tool_definition() for tool in server.tools.values()]
+        return server.tool_definitions
 
     @server.call_tool()
     async def handle_call_tool(
@@ -71,15 +67,19 @@ async def main():
         return await tool.execute(arguments)
 
     async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
-        await server.run(
-            read_stream,
-            write_stream,
-            InitializationOptions(
-                server_name="repl",
-                server_version="0.1.0",
-                capabilities=server.get_capabilities(
-                    notification_options=NotificationOptions(),
-                    experimental_capabilities={},
+        await server.initialize()
+        try:
+            await server.run(
+                read_stream,
+                write_stream,
+                InitializationOptions(
+                    server_name="repl",
+                    server_version="0.1.0",
+                    capabilities=server.get_capabilities(
+                        notification_options=NotificationOptions(),
+                        experimental_capabilities={},
+                    ),
                 ),
-            ),
-        )
+            )
+        finally:
+            await server.shutdown()
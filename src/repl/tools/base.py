@@ -2,6 +2,10 @@ import mcp.types as types
 from abc import ABC, abstractmethod
 from typing import List
 
+# Options shared by every tool subprocess. Python opens its fds non-inheritable
+# (PEP 446) and the pipes are passed explicitly, so the child's close-all pass is skipped.
+SPAWN_OPTIONS = {"close_fds": False}
+
 
 class BaseTool(ABC):
     """Base class for all REPL tools"""
@@ -56,9 +60,9 @@ class CodeOutput:
         if self.stderr:
             response.append(f"Standard Error:\n{self.stderr}")
         if self.result is not None:
-            response.append(f"Return Value:\n{repr(self.result)}")
+            response.append(f"Return Value:\n{self.result!r}")
 
         return [types.TextContent(
             type="text",
-            text="\n".join(response) if response else "No output"
+            text="\n".join(response)
         )]
@@ -1,23 +1,129 @@
 import time
 
 import asyncio
+import hashlib
 import logging
 import mcp.types as types
 import os
-import tempfile
-from typing import List
+from typing import List, Optional
 
-from repl.tools.base import BaseTool, CodeOutput
+from repl.tools.base import BaseTool, CodeOutput, SPAWN_OPTIONS
 
 logger = logging.getLogger('perl_tool')
 
+MAX_CACHED_SCRIPTS = 256  # Compiled scripts the worker keeps before starting over
+SCRIPT_TIMEOUT = 30  # Seconds a script may run before the worker is killed
+
+# Long-lived dispatcher that applies one framed request at a time. The path is
+# already resolved to an absolute, symlink-free target by the caller.
+# Request: "<path length> <script length> <clean whitespace> <digest> <omitted>\n"
+# followed by the raw path and script bytes. With omitted set to 1 the script is
+# left out because the worker has already compiled that digest. Reply: "<OK|ERR|MISS> <length>\n<message>".
+_WORKER_SCRIPT = r"""
+use strict;
+use warnings;
+use Cwd ();
+
+my $cwd = Cwd::getcwd();
+
+# Scripts share this process, so exit must not take the worker down with it
+BEGIN { *CORE::GLOBAL::exit = sub { die "exit is not allowed in perl_script\n" }; }
+
+# Reply on a private handle so anything a script prints cannot corrupt the protocol
+open(my $reply, '>&', \*STDOUT) or die "Cannot dup STDOUT: $!";
+binmode($reply);
+$reply->autoflush(1);
+open(STDOUT, '>&', \*STDERR) or die "Cannot redirect STDOUT: $!";
+binmode(STDIN);
+
+my $counter = 0;
+my %compiled;  # digest => [compiled sub, compile error]
+
+sub respond {
+    my ($status, $message) = @_;
+    utf8::encode($message) if utf8::is_utf8($message);
+    print $reply "$status " . length($message) . "\n" . $message;
+}
+
+while (defined(my $header = <STDIN>)) {
+    my ($path_length, $script_length, $clean_whitespace, $digest, $omitted) = split ' ', $header;
+    my ($path, $script) = ('', '');
+    read(STDIN, $path, $path_length) == $path_length or last;
+    read(STDIN, $script, $script_length) == $script_length or last;
+
+    my $warnings = '';
+    local $SIG{__WARN__} = sub { $warnings .= $_[0] };
+
+    my $entry = $compiled{$digest};
+    unless ($entry) {
+        if ($omitted) {
+            respond('MISS', '');
+            next;
+        }
+        %compiled = () if keys(%compiled) >= __MAX_CACHED_SCRIPTS__;
+
+        # Each script gets its own package so globals do not leak between scripts
+        $counter++;
+        my $transform = eval "package PerlTool::Script$counter;
+use strict;
+use warnings;
+no warnings 'uninitialized';
+use utf8;
+sub {
+    my \$content = shift;
+#line 1 \"perl_script\"
+$script
+;
+    return \$content;
+}";
+        $entry = $compiled{$digest} = [$transform, $transform ? '' : $warnings . $@];
+    }
+    my ($transform, $compile_error) = @$entry;
+
+    my $ok = $transform && eval {
+        my @stat = stat($path) or die "Cannot stat $path: $!\n";
+        open(my $in, '<:utf8', $path) or die "Cannot open $path: $!\n";
+        my $content = do { local $/; <$in> };
+        close($in);
+
+        {
+            # Scripts share this process; keep their changes to I/O globals to the call
+            local ($/, $\, $,, $") = ($/, $\, $,, $");
+            $content = $transform->($content) // '';
+        }
+        chdir($cwd);
+        $content =~ s/[ \t]+$//mg if $clean_whitespace;
+        die "Error: Perl script produced empty output\n" unless length($content);
+
+        # Write a sibling file and rename it over the target, so a failed write
+        # can never leave the original truncated
+        my $temp = "$path.perl_tool.$$";
+        open(my $out, '>:utf8', $temp) or die "Cannot write $temp: $!\n";
+        unless ((print $out $content) && close($out) && chmod($stat[2] & 07777, $temp) && rename($temp, $path)) {
+            my $error = $!;
+            unlink($temp);
+            die "Cannot write $path: $error\n";
+        }
+        1;
+    };
+    chdir($cwd);  # Also when the script died
+
+    if ($ok) {
+        respond('OK', '');
+    } else {
+        respond('ERR', $transform ? $warnings . $@ : $compile_error);
+    }
+}
+""".replace("__MAX_CACHED_SCRIPTS__", str(MAX_CACHED_SCRIPTS))
+
 
 class PerlTool(BaseTool):
     """Efficient file modification tool using Perl.
     
     This tool provides a safer and more efficient way to modify files using Perl's 
-    powerful text processing capabilities. It avoids shell escaping issues by writing
-    the Perl script to a temporary file and handles UTF-8 encoding by default.
+    powerful text processing capabilities. Scripts are sent to a long-lived Perl worker
+    over a framed pipe protocol, which avoids shell escaping issues and a fresh perl
+    startup per call, and UTF-8 encoding is handled by default.
     
     Example usage:
     ```
@@ -33,6 +139,11 @@ class PerlTool(BaseTool):
     ```
     """
 
+    def __init__(self):
+        self._worker: Optional[asyncio.subprocess.Process] = None
+        self._lock = asyncio.Lock()  # The worker handles one request at a time
+        self._compiled: set[str] = set()  # Script digests the current worker has compiled
+
     @property
     def name(self) -> str:
         return "perl"
@@ -53,97 +164,125 @@ Example Perl patterns:
 - Insert at line: $content =~ s/^((?:.*\\n){42})/\\1New line 43\\n/;
 """
 
+    _SCHEMA = {
+        "type": "object",
+        "properties": {
+            "file_path": {
+                "type": "string",
+                "description": "Path to the file to modify"
+            },
+            "perl_script": {
+                "type": "string",
+                "description": "Perl substitution commands to apply (without boilerplate)"
+            },
+            "clean_whitespace": {
+                "type": "boolean",
+                "description": "Remove trailing whitespace (default: true)",
+                "default": True
+            }
+        },
+        "required": ["file_path", "perl_script"]
+    }
+
     @property
     def schema(self) -> dict:
-        return {
-            "type": "object",
-            "properties": {
-                "file_path": {
-                    "type": "string",
-                    "description": "Path to the file to modify"
-                },
-                "perl_script": {
-                    "type": "string",
-                    "description": "Perl substitution commands to apply (without boilerplate)"
-                },
-                "clean_whitespace": {
-                    "type": "boolean",
-                    "description": "Remove trailing whitespace (default: true)",
-                    "default": True
-                }
-            },
-            "required": ["file_path", "perl_script"]
-        }
+        return self._SCHEMA
 
-    async def execute(self, arguments: dict) -> List[types.TextContent]:
-        file_path = arguments.get("file_path")
-        perl_script = arguments.get("perl_script")
-        clean_whitespace = arguments.get("clean_whitespace", True)
+    async def shutdown(self):
+        """Stop the Perl worker"""
+        if self._worker and self._worker.returncode is None:
+            self._worker.kill()
+            await self._worker.wait()
+        self._worker = None
 
-        if not os.path.exists(file_path):
-            raise ValueError(f"File does not exist: {file_path}")
+    async def _get_worker(self) -> asyncio.subprocess.Process:
+        """Return the running Perl worker, starting a new one if needed"""
+        if self._worker is None or self._worker.returncode is not None:
+            self._worker = await asyncio.create_subprocess_exec(
+                "perl",
+                "-e",
+                _WORKER_SCRIPT,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+                **SPAWN_OPTIONS
+            )
+            logger.info("Started Perl worker with PID: %s", self._worker.pid)
+            self._compiled.clear()
+        return self._worker
 
-        # Create temporary directory for our script
-        with tempfile.TemporaryDirectory() as temp_dir:
-            script_path = os.path.join(temp_dir, "modify.pl")
+    @staticmethod
+    async def _exchange(worker: asyncio.subprocess.Process, path: bytes, script: Optional[bytes],
+                        clean_whitespace: bool, digest: str) -> tuple[bytes, bytes]:
+        """Send one framed request, leaving the script out if None, and return (status, message)"""
+        omitted = script is None
+        script = script or b""
+        header = f"{len(path)} {len(script)} {int(bool(clean_whitespace))} {digest} {int(omitted)}\n".encode("ascii")
+        worker.stdin.write(header + path + script)
+        await worker.stdin.drain()
 
-            # Write the Perl script with all necessary boilerplate
-            with open(script_path, "w", encoding="utf-8") as f:
-                script_content = f"""#!/usr/bin/env perl
-use strict;
-use warnings;
-no warnings 'uninitialized';
-use utf8;
-binmode(STDIN, ':utf8');
-binmode(STDOUT, ':utf8');
-local $/;
-my $content = <>;
+        reply = await worker.stdout.readline()
+        if not reply:
+            raise RuntimeError("Perl worker exited unexpectedly")
+        status, length = reply.split()
+        return status, await worker.stdout.readexactly(int(length))
 
-{perl_script}
+    async def _run_script(self, file_path: str, perl_script: str, clean_whitespace: bool) -> tuple[bool, str]:
+        """Apply a script to a file in the worker and return (success, error message)"""
+        # Resolved here, before the script runs, so nothing the script does can redirect the write
+        path = os.fsencode(os.path.realpath(file_path))
+        script = perl_script.encode("utf-8")
+        digest = hashlib.blake2b(script, digest_size=16).hexdigest()
 
-"""
-                if clean_whitespace:
-                    script_content += "$content =~ s/[ \\t]+$//mg;\n\n"
+        async with self._lock:
+            worker = await self._get_worker()
+            try:
+                async with asyncio.timeout(SCRIPT_TIMEOUT):
+                    # Repeated scripts are sent by digest only and reuse the worker's compiled sub
+                    known = digest in self._compiled
+                    status, message = await self._exchange(
+                        worker, path, None if known else script, clean_whitespace, digest
+                    )
+                    if status == b"MISS":
+                        status, message = await self._exchange(worker, path, script, clean_whitespace, digest)
 
-                script_content += "print $content;\n"
-                f.write(script_content)
+                if len(self._compiled) >= MAX_CACHED_SCRIPTS:
+                    self._compiled.clear()
+                self._compiled.add(digest)
+            except BaseException as e:
+                # The protocol state is unknown now, so start over with a fresh worker
+                if worker.returncode is None:
+                    worker.kill()
+                self._worker = None
+                if isinstance(e, TimeoutError):
+                    raise RuntimeError(f"Perl script did not finish within {SCRIPT_TIMEOUT} seconds") from e
+                raise
 
-            # Make script executable
-            os.chmod(script_path, 0o755)
+        return status == b"OK", message.decode("utf-8", errors="replace")
 
-            output = CodeOutput()
-            start_time = time.time()
+    async def execute(self, arguments: dict) -> List[types.TextContent]:
+        file_path = arguments.get("file_path")
+        perl_script = arguments.get("perl_script")
+        clean_whitespace = arguments.get("clean_whitespace", True)
 
-            try:
-                # Run the Perl script and capture output
-                process = await asyncio.create_subprocess_exec(
-                    script_path,
-                    stdin=open(file_path, "r", encoding="utf-8"),
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
-
-                stdout, stderr = await process.communicate()
-
-                if process.returncode == 0 or (
-                        stderr and b"Wide character" in stderr):  # Accept wide character warnings
-                    modified_content = stdout.decode("utf-8")
-                    if modified_content:
-                        # Write content back to original file
-                        with open(file_path, "w", encoding="utf-8") as f:
-                            f.write(modified_content)
-                        output.stdout = "File modified successfully"
-                    else:
-                        output.stderr = "Error: Perl script produced empty output"
-                        output.result = 1
-                else:
-                    output.stderr = stderr.decode("utf-8")
-                    output.result = process.returncode
-
-            except Exception as e:
-                output.stderr = f"Error executing Perl script: {str(e)}"
+        if not os.path.exists(file_path):
+            raise ValueError(f"File does not exist: {file_path}")
+
+        output = CodeOutput()
+        start_time = time.perf_counter()
+
+        try:
+            success, error = await self._run_script(file_path, perl_script, clean_whitespace)
+            if success:
+                output.stdout = "File modified successfully"
+            else:
+                output.stderr = error
                 output.result = 1
-            finally:
-                output.execution_time = time.time() - start_time
 
-            return output.format_output()
+        except Exception as e:
+            output.stderr = f"Error executing Perl script: {str(e)}"
+            output.result = 1
+        finally:
+            output.execution_time = time.perf_counter() - start_time
+
+        return output.format_output()
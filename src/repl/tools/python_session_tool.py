@@ -1,68 +1,201 @@
 import sys
 import time
 
+import ast
 import asyncio
 import code
+import contextlib
+import functools
 import io
+import logging
 import mcp.types as types
-import uuid
-from typing import Dict, List, Optional
+import secrets
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from types import CodeType
+from typing import Deque, Iterator, List, Optional, TextIO
 
 from repl.tools.base import BaseTool
 
+logger = logging.getLogger('python_session_tool')
+
+MAX_CACHED_SOURCE = 8192  # Longer sources are compiled without caching
+
+# Namespace a fresh session starts with (matches code.InteractiveInterpreter's default)
+_SESSION_GLOBALS = {"__name__": "__console__", "__doc__": None}
+
+
+def _compile_source(code_str: str) -> tuple[Optional[CodeType], Optional[CodeType], bool]:
+    """Parse once and compile, returning (statements, trailing_expression, literal_only)"""
+    tree = ast.parse(code_str, "<input>", "exec")
+    expression = None
+    literal_only = False
+    if tree.body and isinstance(tree.body[-1], ast.Expr):
+        node = tree.body.pop().value
+        # A lone expression with no names or calls has no way to write output
+        literal_only = not tree.body and not any(
+            isinstance(child, (ast.Call, ast.Name)) for child in ast.walk(node)
+        )
+        expression = compile(ast.Expression(node), "<input>", "eval")
+    statements = compile(tree, "<input>", "exec") if tree.body else None
+    return statements, expression, literal_only
+
+
+# Compilation is pure, so one cache is shared by every session
+@functools.lru_cache(maxsize=512)
+def _cached_compile(code_str: str) -> tuple[Optional[CodeType], Optional[CodeType], bool]:
+    return _compile_source(code_str)
+
+
+def _compile(code_str: str) -> tuple[Optional[CodeType], Optional[CodeType], bool]:
+    """Compile code, reusing the result for short, frequently repeated snippets"""
+    if len(code_str) > MAX_CACHED_SOURCE:
+        return _compile_source(code_str)
+    return _cached_compile(code_str)
+
+
+class _ThreadLocalStream:
+    """Stand-in for sys.stdout/sys.stderr that writes to the current thread's capture buffer"""
+
+    def __init__(self, fallback: TextIO):
+        self._fallback = fallback
+        self._local = threading.local()
+        self._active: List[TextIO] = []  # Captures in progress on any thread
+
+    def _target(self) -> TextIO:
+        target = getattr(self._local, "target", None)
+        if target is not None:
+            return target
+        # Threads started by session code have no capture of their own; while a
+        # single capture is in progress their output belongs to it
+        try:
+            (target,) = self._active
+        except ValueError:
+            return self._fallback
+        return target
+
+    def write(self, s: str) -> int:
+        return self._target().write(s)
+
+    def flush(self):
+        self._target().flush()
+
+    def __getattr__(self, name: str):
+        return getattr(self._target(), name)
+
+    @contextlib.contextmanager
+    def capture(self, target: TextIO) -> Iterator[None]:
+        previous = getattr(self._local, "target", None)
+        self._local.target = target
+        self._active.append(target)
+        try:
+            yield
+        finally:
+            self._active.remove(target)
+            self._local.target = previous
+
+
+_install_lock = threading.Lock()
+
+
+def _thread_local_stream(name: str) -> _ThreadLocalStream:
+    """Install (once) and return the thread-local proxy for sys.stdout or sys.stderr"""
+    with _install_lock:
+        stream = getattr(sys, name)
+        if not isinstance(stream, _ThreadLocalStream):
+            # Real stdout carries the MCP protocol, so output that cannot be
+            # attributed to a session goes to stderr instead
+            stream = _ThreadLocalStream(sys.__stderr__ if name == "stdout" else stream)
+            setattr(sys, name, stream)
+        return stream
+
+
+@contextlib.contextmanager
+def _capture_output(stdout: TextIO, stderr: TextIO) -> Iterator[None]:
+    """Capture the calling thread's stdout/stderr without affecting other threads"""
+    with _thread_local_stream("stdout").capture(stdout), _thread_local_stream("stderr").capture(stderr):
+        yield
+
 
 class AsyncInterpreter:
     """Async wrapper around code.InteractiveInterpreter"""
 
-    def __init__(self, session_id: str):
+    def __init__(self, session_id: str, executor: Optional[Executor] = None):
         self.session_id = session_id
-        self.interpreter = code.InteractiveInterpreter()
+        self.executor = executor
+        self.interpreter = code.InteractiveInterpreter(_SESSION_GLOBALS.copy())
         self.locals = self.interpreter.locals
         self.stdout = io.StringIO()
         self.stderr = io.StringIO()
-        self.last_used = time.time()
+        self.last_used = time.monotonic()
+        self._lock = asyncio.Lock()  # Serializes executions within one session
 
-    async def execute(self, code_str: str) -> tuple[str, str, float]:
-        """Execute code and return (stdout, stderr, execution_time)"""
-        self.last_used = time.time()
-        start_time = time.time()
+    def reset(self, session_id: str):
+        """Clear interpreter state so the instance can back a new session"""
+        self.session_id = session_id
+        self.locals.clear()
+        self.locals.update(_SESSION_GLOBALS)
+        self.last_used = time.monotonic()
 
-        # Redirect stdout/stderr
-        old_stdout = sys.stdout
-        old_stderr = sys.stderr
-        sys.stdout = self.stdout
-        sys.stderr = self.stderr
+    @property
+    def busy(self) -> bool:
+        """Whether code is running or queued in this session"""
+        return self._lock.locked()
 
-        try:
-            # Try to compile the code first
+    async def execute(self, code_str: str) -> tuple[str, str, float]:
+        """Execute code and return (stdout, stderr, execution_time)"""
+        self.last_used = time.monotonic()
+        loop = asyncio.get_running_loop()
+        async with self._lock:
             try:
-                compiled_code = compile(code_str, "<input>", "exec")
-                if compiled_code is None:
-                    self.stderr.write("Incomplete input\n")
-                else:
-                    exec(compiled_code, self.locals)
-            except Exception as e:
-                self.stderr.write(f"Error: {str(e)}\n")
-                # Try running as separate statements
-                for statement in code_str.split('\n'):
-                    statement = statement.strip()
-                    if statement and not statement.startswith('#'):
-                        try:
-                            self.interpreter.runsource(statement, "<input>", "single")
-                        except Exception as e:
-                            self.stderr.write(f"Error in statement '{statement}': {str(e)}\n")
-        finally:
-            # Restore stdout/stderr
-            sys.stdout = old_stdout
-            sys.stderr = old_stderr
+                return await loop.run_in_executor(self.executor, self._run, code_str)
+            finally:
+                # Idle time counts from the end of the run, not its start
+                self.last_used = time.monotonic()
+
+    def _echo(self, value):
+        """Write an expression's repr to the session output, as an interactive prompt would"""
+        if value is not None:
+            self.stdout.write(f"{value!r}\n")
+
+    def _run(self, code_str: str) -> tuple[str, str, float]:
+        """Run code synchronously on the executor thread"""
+        start_time = time.perf_counter()
+
+        literal_only = False
+        with _capture_output(self.stdout, self.stderr):
+            # Compile inside the capture so warnings such as SyntaxWarning reach this session
+            try:
+                statements, expression, literal_only = _compile(code_str)
+            except (SyntaxError, ValueError, OverflowError):
+                self.interpreter.showsyntaxerror("<input>")
+            else:
+                if not literal_only:
+                    try:
+                        if statements is not None:
+                            exec(statements, self.locals)
+                        if expression is not None:
+                            self._echo(eval(expression, self.locals))
+                    except Exception:
+                        self.interpreter.showtraceback()
+
+        if literal_only:
+            # Evaluate probes like `1 + 1`, which cannot write output, outside the capture
+            try:
+                self._echo(eval(expression, self.locals))
+            except Exception:
+                with _capture_output(self.stdout, self.stderr):
+                    self.interpreter.showtraceback()
 
-        exec_time = time.time() - start_time
+        exec_time = time.perf_counter() - start_time
         stdout = self.stdout.getvalue()
         stderr = self.stderr.getvalue()
 
-        # Clear buffers for next execution
-        self.stdout = io.StringIO()
-        self.stderr = io.StringIO()
+        # Reset buffers in place for next execution
+        for buf in (self.stdout, self.stderr):
+            buf.seek(0)
+            buf.truncate(0)
 
         return stdout, stderr, exec_time
 
@@ -72,6 +205,9 @@ class SessionManager:
 
     _instance: Optional['SessionManager'] = None
 
+    POOL_SIZE = 32  # Maximum number of expired interpreters kept for reuse
+    MAX_WORKERS = 4  # Sessions that may execute code concurrently
+
     @classmethod
     def get_instance(cls, timeout_seconds: int = 300) -> 'SessionManager':
         if not cls._instance:
@@ -81,49 +217,104 @@ class SessionManager:
     @classmethod
     def reset_instance(cls):
         if cls._instance:
-            asyncio.create_task(cls._instance.stop())
-            cls._instance = None
+            instance, cls._instance = cls._instance, None
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                asyncio.run(instance.stop())
+            else:
+                loop.create_task(instance.stop())
 
     def __init__(self, timeout_seconds: int = 300):
-        self.interpreters: Dict[str, AsyncInterpreter] = {}
+        # Ordered least to most recently used, so expired sessions sit at the front
+        self.interpreters: OrderedDict[str, AsyncInterpreter] = OrderedDict()
+        self._pool: Deque[AsyncInterpreter] = deque(maxlen=self.POOL_SIZE)
         self.timeout_seconds = timeout_seconds
+        self.executor: Optional[ThreadPoolExecutor] = None  # Created by start(), shut down by stop()
         self.cleanup_task: Optional[asyncio.Task] = None
+        self._stop_event = asyncio.Event()
         self._initialized = False
 
     async def start(self):
         if not self._initialized:
+            self._bind_executor(ThreadPoolExecutor(
+                max_workers=self.MAX_WORKERS,
+                thread_name_prefix="python_session",
+            ))
+            self._stop_event.clear()
             self.cleanup_task = asyncio.create_task(self._cleanup_loop())
             self._initialized = True
 
     async def stop(self):
-        if self.cleanup_task:
-            self.cleanup_task.cancel()
-            try:
-                await self.cleanup_task
-            except asyncio.CancelledError:
-                pass
-            self._initialized = False
+        if self.cleanup_task and not self.cleanup_task.done():
+            # Wake the cleanup loop so it exits on its own rather than being cancelled
+            self._stop_event.set()
+            await self.cleanup_task
+        self.cleanup_task = None
+        self._initialized = False
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self._bind_executor(None)
+
+    def _bind_executor(self, executor: Optional[ThreadPoolExecutor]):
+        """Point the manager and every interpreter it holds at executor"""
+        self.executor = executor
+        for interpreter in (*self.interpreters.values(), *self._pool):
+            interpreter.executor = executor
 
     async def _cleanup_loop(self):
         while True:
-            await asyncio.sleep(60)  # Check every minute
-            current_time = time.time()
-            to_remove = []
+            try:
+                async with asyncio.timeout(self._next_expiry_delay()):
+                    await self._stop_event.wait()
+                return
+            except TimeoutError:
+                pass
 
-            for session_id, interpreter in self.interpreters.items():
-                if current_time - interpreter.last_used > self.timeout_seconds:
-                    to_remove.append(session_id)
+            now = time.monotonic()
+            for _ in range(len(self.interpreters)):
+                session_id, interpreter = next(iter(self.interpreters.items()))
+                if now - interpreter.last_used <= self.timeout_seconds:
+                    break
+                if interpreter.busy:
+                    # A running session is in use; recycling it would hand its live state to another
+                    interpreter.last_used = now
+                    self.interpreters.move_to_end(session_id)
+                else:
+                    # Recycle the interpreter instead of discarding it
+                    self._pool.append(self.interpreters.popitem(last=False)[1])
 
-            for session_id in to_remove:
-                del self.interpreters[session_id]
+            logger.debug("Compile cache: %s", _cached_compile.cache_info())
+
+    def _next_expiry_delay(self) -> float:
+        """Seconds until the least recently used session expires"""
+        if not self.interpreters:
+            return self.timeout_seconds
+        oldest = next(iter(self.interpreters.values()))
+        return max(0.0, oldest.last_used + self.timeout_seconds - time.monotonic())
 
     def create_session(self) -> str:
-        session_id = str(uuid.uuid4())
-        self.interpreters[session_id] = AsyncInterpreter(session_id)
+        session_id = secrets.token_hex(16)
+        if self._pool:
+            interpreter = self._pool.popleft()
+            interpreter.reset(session_id)
+        else:
+            interpreter = AsyncInterpreter(session_id, self.executor)
+        self.interpreters[session_id] = interpreter
         return session_id
 
     def get_session(self, session_id: str) -> Optional[AsyncInterpreter]:
-        return self.interpreters.get(session_id)
+        interpreter = self.interpreters.get(session_id)
+        if interpreter:
+            self.interpreters.move_to_end(session_id)
+        return interpreter
+
+    async def execute_code(self, session_id: str, code_str: str) -> tuple[str, str, float]:
+        """Execute code in an existing session and return (stdout, stderr, execution_time)"""
+        interpreter = self.get_session(session_id)
+        if not interpreter:
+            raise ValueError(f"Session not found or expired: {session_id}")
+        return await interpreter.execute(code_str)
 
 
 class PythonSessionTool(BaseTool):
@@ -156,22 +347,24 @@ Key features:
 - More flexible execution environment
 """
 
+    _SCHEMA = {
+        "type": "object",
+        "properties": {
+            "session_id": {
+                "type": "string",
+                "description": "Session ID (leave empty to create new session)"
+            },
+            "code": {
+                "type": "string",
+                "description": "Python code to execute"
+            },
+        },
+        "required": ["code"]
+    }
+
     @property
     def schema(self) -> dict:
-        return {
-            "type": "object",
-            "properties": {
-                "session_id": {
-                    "type": "string",
-                    "description": "Session ID (leave empty to create new session)"
-                },
-                "code": {
-                    "type": "string",
-                    "description": "Python code to execute"
-                },
-            },
-            "required": ["code"]
-        }
+        return self._SCHEMA
 
     async def initialize(self):
         """Initialize the session manager"""
@@ -188,31 +381,32 @@ Key features:
             raise ValueError("Missing code parameter")
 
         session_id = arguments.get("session_id")
-        response = []
+        # Write sections straight into one buffer so large outputs are copied only once
+        response = io.StringIO()
 
         if not session_id:
             # Create new session
             session_id = self.session_manager.create_session()
-            response.append(f"Created new session: {session_id}")
+            response.write(f"Created new session: {session_id}\n")
 
         try:
             stdout, stderr, exec_time = await self.session_manager.execute_code(
                 session_id, code
             )
 
-            response.extend([
-                f"Session: {session_id}",
-                f"Execution time: {exec_time:.4f} seconds",
-            ])
+            response.write(f"Session: {session_id}\n")
+            response.write(f"Execution time: {exec_time:.4f} seconds")
 
             if stdout:
-                response.append(f"Standard Output:\n{stdout}")
+                response.write("\nStandard Output:\n")
+                response.write(stdout)
             if stderr:
-                response.append(f"Standard Error:\n{stderr}")
+                response.write("\nStandard Error:\n")
+                response.write(stderr)
 
             return [types.TextContent(
                 type="text",
-                text="\n".join(response)
+                text=response.getvalue()
             )]
         except ValueError as e:
             return [types.TextContent(
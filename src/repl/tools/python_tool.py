@@ -1,18 +1,100 @@
 import sys
 import time
-import ast
 import asyncio
+import io
 import mcp.types as types
+import struct
+from typing import Dict, List
+
+from repl.tools.base import BaseTool, SPAWN_OPTIONS
+
+# Request header: byte length of the code to run
+REQUEST_HEADER = struct.Struct("<I")
+# Reply header: byte lengths of captured stdout, stderr and the result repr
+REPLY_HEADER = struct.Struct("<III")
+
+# Child-side wrapper, run with `python -c` so no script file is written per call.
+# It reads the request from stdin, captures output and writes one framed reply.
+WRAPPER_CODE = """
+import ast
 import os
-import tempfile
-from typing import List
+import site
+import struct
+import sys
+import traceback
+from io import StringIO
 
-from repl.tools.base import BaseTool
+# Read the code to run from the length-prefixed request on stdin
+request = sys.stdin.buffer
+(code_len,) = struct.unpack("__REQUEST_HEADER__", request.read(struct.calcsize("__REQUEST_HEADER__")))
+code = request.read(code_len).decode("utf-8")
+
+# Started with -S while idle; process site-packages and .pth files only now, so
+# changes made to the environment since the spare started are picked up
+site.main()
+
+# Reply on a private copy of stdout; fd-level writes from user code go to stderr
+reply = os.fdopen(os.dup(1), "wb")
+os.dup2(2, 1)
+
+# Redirect stdout/stderr
+stdout = StringIO()
+stderr = StringIO()
+original_stdout = sys.stdout
+original_stderr = sys.stderr
+sys.stdout = stdout
+sys.stderr = stderr
+
+# Run user code in its own namespace so it cannot clobber the wrapper's names
+user_globals = {"__name__": "__main__", "__builtins__": __builtins__}
+
+result = b""
+try:
+    # Parse and compile once, splitting off a trailing expression if present
+    try:
+        tree = ast.parse(code, "<input>", "exec")
+        expression = None
+        if tree.body and isinstance(tree.body[-1], ast.Expr):
+            expression = compile(ast.Expression(tree.body.pop().value), "<input>", "eval")
+        statements = compile(tree, "<input>", "exec")
+    except SyntaxError as e:
+        # The compiler's own frames are noise; show just the error like the interactive prompt
+        sys.stderr.write("".join(traceback.format_exception_only(type(e), e)))
+    else:
+        # Errors raised while running, SyntaxErrors included, keep their traceback
+        exec(statements, user_globals)
+        if expression is not None:
+            result = repr(eval(expression, user_globals)).encode("utf-8", "replace")
+
+except Exception:
+    traceback.print_exc()
+
+finally:
+    # Restore stdout/stderr and send the captured output as one length-prefixed reply
+    sys.stdout = original_stdout
+    sys.stderr = original_stderr
+    out = stdout.getvalue().encode("utf-8", "replace")
+    err = stderr.getvalue().encode("utf-8", "replace")
+    reply.write(struct.pack("__REPLY_HEADER__", len(out), len(err), len(result)))
+    reply.write(out)
+    reply.write(err)
+    reply.write(result)
+    reply.flush()
+""".replace(
+    "__REQUEST_HEADER__", REQUEST_HEADER.format
+).replace(
+    "__REPLY_HEADER__", REPLY_HEADER.format
+)
 
 
 class PythonTool(BaseTool):
     """Tool for executing Python code in a sandboxed environment"""
 
+    def __init__(self):
+        # One pre-started wrapper per interpreter path, already past startup and
+        # waiting on stdin for its code. Each process still runs a single request.
+        self._spares: Dict[str, asyncio.Task] = {}
+
     @property
     def name(self) -> str:
         return "python"
@@ -37,22 +119,76 @@ Key features:
 - Clean separation between runs
 """
 
+    _SCHEMA = {
+        "type": "object",
+        "properties": {
+            "code": {
+                "type": "string",
+                "description": "Python code to execute"
+            },
+            "python_path": {
+                "type": "string",
+                "description": "Optional path to Python executable (defaults to server interpreter)"
+            }
+        },
+        "required": ["code"]
+    }
+
     @property
     def schema(self) -> dict:
-        return {
-            "type": "object",
-            "properties": {
-                "code": {
-                    "type": "string",
-                    "description": "Python code to execute"
-                },
-                "python_path": {
-                    "type": "string",
-                    "description": "Optional path to Python executable (defaults to server interpreter)"
-                }
-            },
-            "required": ["code"]
-        }
+        return self._SCHEMA
+
+    async def shutdown(self):
+        """Stop any idle spare processes"""
+        spares = list(self._spares.values())
+        self._spares.clear()
+        for process in await asyncio.gather(*spares, return_exceptions=True):
+            if isinstance(process, asyncio.subprocess.Process) and process.returncode is None:
+                process.kill()
+                await process.wait()
+
+    @staticmethod
+    async def _spawn(python_path: str) -> asyncio.subprocess.Process:
+        return await asyncio.create_subprocess_exec(
+            python_path,
+            "-S",
+            "-c",
+            WRAPPER_CODE,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            **SPAWN_OPTIONS
+        )
+
+    async def _take_process(self, python_path: str) -> asyncio.subprocess.Process:
+        """Return a started wrapper for python_path and start a spare for the next call"""
+        spare = self._spares.pop(python_path, None)
+        process = None
+        if spare is not None:
+            try:
+                process = await spare
+            except OSError:
+                pass  # Spawn failed; retry below so the error is reported for this call
+        if process is None or process.returncode is not None:
+            process = await self._spawn(python_path)
+        # Concurrent calls may already have started the next spare; never orphan it
+        if python_path not in self._spares:
+            self._spares[python_path] = asyncio.create_task(self._spawn(python_path))
+        return process
+
+    @staticmethod
+    async def _read_reply(stream: asyncio.StreamReader) -> tuple[str, str, str]:
+        """Read the wrapper's framed (stdout, stderr, result) reply; empty if the child died first"""
+        try:
+            header = await stream.readexactly(REPLY_HEADER.size)
+            out_len, err_len, result_len = REPLY_HEADER.unpack(header)
+            return (
+                (await stream.readexactly(out_len)).decode("utf-8"),
+                (await stream.readexactly(err_len)).decode("utf-8"),
+                (await stream.readexactly(result_len)).decode("utf-8"),
+            )
+        except asyncio.IncompleteReadError:
+            return "", "", ""
 
     async def execute(self, arguments: dict) -> List[types.TextContent]:
         code = arguments.get("code")
@@ -60,136 +196,53 @@ Key features:
             raise ValueError("Missing code parameter")
 
         python_path = arguments.get("python_path", sys.executable)
-        start_time = time.time()
+        start_time = time.perf_counter()
 
-        # Analyze the code to determine if the last statement is an expression
-        try:
-            parsed = ast.parse(code)
-            if parsed.body and isinstance(parsed.body[-1], ast.Expr):
-                # Split into statements and final expression
-                *statements, last_expr = parsed.body
-                if statements:
-                    exec_code = ast.unparse(ast.Module(body=statements, type_ignores=[]))
-                    eval_code = ast.unparse(last_expr.value)
-                else:
-                    exec_code = ""
-                    eval_code = ast.unparse(last_expr.value)
-            else:
-                exec_code = code
-                eval_code = None
-        except Exception:
-            # If parsing fails, treat entire code as exec
-            exec_code = code
-            eval_code = None
-
-        # Create a wrapper script that captures output and handles errors
-        wrapper_code = """
-import sys
-import traceback
-from io import StringIO
-import time
-
-# Redirect stdout/stderr
-stdout = StringIO()
-stderr = StringIO()
-original_stdout = sys.stdout
-original_stderr = sys.stderr
-sys.stdout = stdout
-sys.stderr = stderr
-
-result = None
-try:
-    # Execute any statements first
-    if __EXEC_CODE__:
-        exec(__EXEC_CODE__)
-    
-    # Then evaluate final expression if present
-    if __EVAL_CODE__:
-        result = eval(__EVAL_CODE__)
-        print(f"__RESULT__:{repr(result)}")
-        
-except Exception:
-    traceback.print_exc()
-
-# Restore stdout/stderr and get output
-sys.stdout = original_stdout
-sys.stderr = original_stderr
-
-# Print captured output with markers
-print("__STDOUT__")
-print(stdout.getvalue())
-print("__STDERR__")
-print(stderr.getvalue())
-"""
-
-        # Create a temporary file with the code
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False, encoding='utf-8') as f:
-            # Replace the placeholders with actual code
-            wrapped_code = wrapper_code.replace("__EXEC_CODE__", repr(exec_code))
-            wrapped_code = wrapped_code.replace("__EVAL_CODE__", repr(eval_code))
-            f.write(wrapped_code)
-            temp_file = f.name
+        # Send the raw code once; the child splits off a trailing expression itself
+        code_bytes = code.encode("utf-8")
+        request = REQUEST_HEADER.pack(len(code_bytes)) + code_bytes
 
         try:
-            # Execute the code in a separate process
-            process = await asyncio.create_subprocess_exec(
-                python_path,
-                temp_file,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
+            # Execute the code in a separate, already started process
+            process = await self._take_process(python_path)
 
-            stdout, stderr = await process.communicate()
-            exec_time = time.time() - start_time
-
-            # Process output and extract sections
-            output = stdout.decode('utf-8') if stdout else ""
-            error_output = stderr.decode('utf-8') if stderr else ""
-
-            # Parse the output sections
-            result = None
-            stdout_content = ""
-            stderr_content = ""
-
-            current_section = None
-            for line in output.split('\n'):
-                if line == "__STDOUT__":
-                    current_section = "stdout"
-                    continue
-                elif line == "__STDERR__":
-                    current_section = "stderr"
-                    continue
-                elif line.startswith("__RESULT__:"):
-                    result = line[len("__RESULT__:"):]
-                    continue
-                
-                if current_section == "stdout":
-                    stdout_content += line + '\n'
-                elif current_section == "stderr":
-                    stderr_content += line + '\n'
+            stderr_task = asyncio.create_task(process.stderr.read())
+            try:
+                process.stdin.write(request)
+                await process.stdin.drain()
+                process.stdin.close()
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # The child exited before reading its code; stderr says why
+
+            stdout_content, stderr_content, result = await self._read_reply(process.stdout)
+            stderr = await stderr_task
+            await process.wait()
+            exec_time = time.perf_counter() - start_time
 
             # Add any direct stderr output
-            if error_output:
-                stderr_content += error_output
+            if stderr:
+                stderr_content += stderr.decode('utf-8', errors='replace')
 
-            # Format response
-            response = []
+            # Format response, writing sections straight into one buffer
+            response = io.StringIO()
 
             if python_path != sys.executable:
-                response.append(f"Using Python: {python_path}")
+                response.write(f"Using Python: {python_path}\n")
 
-            response.append(f"Execution time: {exec_time:.4f} seconds")
+            response.write(f"Execution time: {exec_time:.4f} seconds")
 
             if stdout_content.strip():
-                response.append(f"Standard Output:\n{stdout_content.rstrip()}")
+                response.write("\nStandard Output:\n")
+                response.write(stdout_content.rstrip())
             if stderr_content.strip():
-                response.append(f"Standard Error:\n{stderr_content.rstrip()}")
+                response.write("\nStandard Error:\n")
+                response.write(stderr_content.rstrip())
             if result:
-                response.append(f"Result: {result}")
+                response.write(f"\nResult: {result}")
 
             return [types.TextContent(
                 type="text",
-                text="\n".join(response)
+                text=response.getvalue()
             )]
 
         except Exception as e:
@@ -197,10 +250,3 @@ print(stderr.getvalue())
                 type="text",
                 text=f"Error executing Python code: {str(e)}"
             )]
-
-        finally:
-            # Clean up the temporary file
-            try:
-                os.unlink(temp_file)
-            except Exception:
-                pass
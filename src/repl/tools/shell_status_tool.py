@@ -16,7 +16,7 @@ class ShellStatusTool(BaseTool):
     # Operation
     1. Automatic Waiting:
        - If task is still running, waits up to 5 seconds for completion
-       - Checks status every 100ms
+       - Returns as soon as the task finishes
        - Returns latest status even if task isn't finished
        - Can be called multiple times on the same task
     
@@ -66,7 +66,7 @@ class ShellStatusTool(BaseTool):
        ```
     
     3. Task Lifecycle:
-       - Task IDs remain valid until server restart
+       - Task IDs remain valid for an hour after the task finishes
        - Can check old tasks' status and output
        - Failed tasks include error details in stderr
     
@@ -91,18 +91,20 @@ class ShellStatusTool(BaseTool):
 Provide the task ID that was returned by the shell command.
 Will wait up to 5 seconds for task completion."""
 
+    _SCHEMA = {
+        "type": "object",
+        "properties": {
+            "task_id": {
+                "type": "string",
+                "description": "Task ID from shell command"
+            }
+        },
+        "required": ["task_id"]
+    }
+
     @property
     def schema(self) -> dict:
-        return {
-            "type": "object",
-            "properties": {
-                "task_id": {
-                    "type": "string",
-                    "description": "Task ID from shell command"
-                }
-            },
-            "required": ["task_id"]
-        }
+        return self._SCHEMA
 
     async def execute(self, arguments: dict) -> List[types.TextContent]:
         task_id = arguments.get("task_id")
@@ -113,33 +115,29 @@ Will wait up to 5 seconds for task completion."""
             raise ValueError(f"Task {task_id} not found")
 
         task = self.shell_tool.tasks[task_id]
-        logger.debug(f"Checking status of task {task_id}: {task.status}")
+        logger.debug("Checking status of task %s: %s", task_id, task.status)
 
-        # If task isn't completed yet, wait up to MAX_WAIT seconds
-        if task.status == "running":
+        # If task isn't completed yet, wait up to MAX_WAIT seconds for it to finish
+        if not task.done_event.is_set():
             try:
-                start_time = asyncio.get_event_loop().time()
-                while (asyncio.get_event_loop().time() - start_time) < self.MAX_WAIT:
-                    if task.status != "running":
-                        break
-                    await asyncio.sleep(0.1)  # Check every 100ms
-            except Exception as e:
-                logger.error(f"Error while waiting for task completion: {e}")
-
-        # Now format the response
-        status_text = f"Status: {task.status}\n"
-        if task.execution_time:
-            status_text += f"Execution time: {task.execution_time:.4f} seconds\n"
+                await asyncio.wait_for(task.done_event.wait(), timeout=self.MAX_WAIT)
+            except asyncio.TimeoutError:
+                pass
+
+        # Now format the response, appending output as-is so it is copied only by the join
+        response = [f"Status: {task.status}\n"]
+        if task.execution_time_str is not None:
+            response.append(f"Execution time: {task.execution_time_str}")
         else:
-            status_text += f"Running time: {task.running_time:.4f} seconds\n"
+            response.append(f"Running time: {task.running_time:.4f} seconds")
         if task.stdout:
-            status_text += f"\nStandard Output:\n{task.stdout}\n"
+            response += ("\n\nStandard Output:\n", task.stdout)
         if task.stderr:
-            status_text += f"\nStandard Error:\n{task.stderr}\n"
+            response += ("\n\nStandard Error:\n", task.stderr)
         if task.result is not None:
-            status_text += f"\nReturn Value:\n{task.result}"
+            response.append(f"\n\nReturn Value:\n{task.result}")
 
         return [types.TextContent(
             type="text",
-            text=status_text
+            text="".join(response)
         )]
@@ -1,39 +1,140 @@
 import time
 
 import asyncio
+import contextlib
+import itertools
 import logging
 import mcp.types as types
 import os
 import pathlib
-import uuid
-from typing import List, Dict, Optional
+import re
+import secrets
+import shutil
+import signal
+from collections import deque
+from typing import AsyncIterator, Deque, List, Dict, Optional, Set
 
-from repl.tools.base import BaseTool, CodeOutput
+from repl.tools.base import BaseTool, SPAWN_OPTIONS
 
 # Configure logging
 logger = logging.getLogger('shell_tool')
 
+MAX_OUTPUT_BYTES = 1 << 20  # Output kept per stream, split between its start and end
+READ_CHUNK = 1 << 16  # Also the pipe reader's limit: it pauses the pipe past twice this
+MAX_KNOWN_DIRS = 256
+TERMINATE_GRACE = 1.0  # Seconds between SIGTERM and SIGKILL for an abandoned command
+
+_DEFAULT_CWD = str(pathlib.Path.home())  # Used when no working_dir is given
+
+# Commands with none of these characters are a single word the shell would
+# only look up and exec, so they can be exec'd directly without a shell
+_SHELL_META = re.compile(r"[\s|&;<>()$`\\\"'*?\[\]{}~!#=%^]")
+_SHELL_KEYWORDS = frozenset({
+    "case", "coproc", "do", "done", "elif", "else", "esac", "fi", "for",
+    "function", "if", "in", "select", "then", "time", "until", "while",
+})
+
+# Task ids are a per-process nonce plus a counter; the nonce keeps ids from
+# before a restart from matching new tasks
+_TASK_NONCE = secrets.randbits(32)
+_task_counter = itertools.count(1)
+
+# Working directories already seen to exist; misses are never cached so a
+# directory created after a failed call is picked up on the next one
+_known_dirs: Set[str] = set()
+
+
+def _dir_exists(path: str) -> bool:
+    """Check that path is a directory, skipping the stat for recently seen ones"""
+    if path in _known_dirs:
+        return True
+    if not os.path.isdir(path):
+        return False
+    if len(_known_dirs) >= MAX_KNOWN_DIRS:
+        _known_dirs.clear()
+    _known_dirs.add(path)
+    return True
+
+
+async def _terminate(process: asyncio.subprocess.Process):
+    """Stop a command's whole process group, escalating to SIGKILL if it lingers"""
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        try:
+            # Commands start in their own session, so their pid is also the group id
+            os.killpg(process.pid, sig)
+        except ProcessLookupError:
+            return
+        try:
+            await asyncio.wait_for(process.wait(), TERMINATE_GRACE)
+            return
+        except asyncio.TimeoutError:
+            pass
+
+
+async def _drain(stream: asyncio.StreamReader, limit: int = MAX_OUTPUT_BYTES) -> str:
+    """Read a stream to EOF, keeping its first and last limit/2 bytes around a truncation marker"""
+    half = limit // 2
+    head = bytearray()
+    tail: Deque[bytes] = deque()
+    tail_size = 0
+    total = 0
+    while chunk := await stream.read(READ_CHUNK):
+        total += len(chunk)
+        if len(head) < half:
+            taken = half - len(head)
+            head += chunk[:taken]
+            chunk = chunk[taken:]
+            if not chunk:
+                continue
+        tail.append(chunk)
+        tail_size += len(chunk)
+        # Drop whole chunks while what remains still covers the tail budget
+        while tail_size - len(tail[0]) >= half:
+            tail_size -= len(tail.popleft())
+
+    tail_bytes = b"".join(tail)
+    if total <= limit:
+        return (bytes(head) + tail_bytes).decode("utf-8", errors="replace")
+    tail_bytes = tail_bytes[-half:]
+    dropped = total - len(head) - len(tail_bytes)
+    return (
+        head.decode("utf-8", errors="replace")
+        + f"\n...[{dropped} bytes truncated]...\n"
+        + tail_bytes.decode("utf-8", errors="replace")
+    )
+
 
 class ShellTask:
-    def __init__(self, command: str, shell: str, working_dir: str):
-        self.id = str(uuid.uuid4())
+    def __init__(self, command: str, shell: str, working_dir: str, capture_output: bool = True):
+        self.id = f"{_TASK_NONCE:08x}-{next(_task_counter):x}"
         self.command = command
         self.shell = shell
         self.working_dir = working_dir
+        self.capture_output = capture_output
         self.process: Optional[asyncio.subprocess.Process] = None
+        self.runner: Optional[asyncio.Task] = None  # Keeps the background run referenced
         self.status = "pending"  # pending, running, completed, failed
         self.stdout = ""
         self.stderr = ""
         self.result = None
         self.execution_time = None
+        self.execution_time_str: Optional[str] = None  # Formatted once, when the task finishes
         self.start_time = None
+        self.done_event = asyncio.Event()  # Set once status is completed or failed
 
     @property
     def running_time(self) -> float:
         if self.start_time:
-            return time.time() - self.start_time
+            return time.monotonic() - self.start_time
         return 0.0
 
+    def finish(self, status: str):
+        """Mark the task completed or failed and wake anyone waiting on it"""
+        self.status = status
+        self.execution_time = time.monotonic() - self.start_time
+        self.execution_time_str = f"{self.execution_time:.4f} seconds"
+        self.done_event.set()
+
 
 class ShellTool(BaseTool):
     """Execute shell commands with automatic async mode for long-running commands.
@@ -106,6 +207,10 @@ class ShellTool(BaseTool):
 
     SYNC_TIMEOUT = 4.9  # Switch to async mode if command doesn't complete within 5 seconds
 
+    TASK_RETENTION = 3600  # Seconds a finished task stays available to shell_status
+
+    _SHELL_PATHS: Dict[str, str] = {}  # Shell name -> absolute path, resolved on first use
+
     def __init__(self):
         self.tasks: Dict[str, ShellTask] = {}
 
@@ -130,28 +235,35 @@ Example responses:
    Task started with ID: 1234-5678-90
    Use shell_status with this task ID to check progress."""
 
+    _SCHEMA = {
+        "type": "object",
+        "properties": {
+            "shell": {
+                "type": "string",
+                "description": "Shell to use (bash/sh/zsh)",
+                "default": "bash",
+                "enum": ["bash", "sh", "zsh"]
+            },
+            "working_dir": {
+                "type": "string",
+                "description": "Working directory to execute the command in (defaults to user home)"
+            },
+            "command": {
+                "type": "string",
+                "description": "Shell command to execute"
+            },
+            "capture_output": {
+                "type": "boolean",
+                "description": "Capture stdout/stderr; set false when the command redirects its own output (default: true)",
+                "default": True
+            }
+        },
+        "required": ["command"]
+    }
+
     @property
     def schema(self) -> dict:
-        return {
-            "type": "object",
-            "properties": {
-                "shell": {
-                    "type": "string",
-                    "description": "Shell to use (bash/sh/zsh)",
-                    "default": "bash",
-                    "enum": ["bash", "sh", "zsh"]
-                },
-                "working_dir": {
-                    "type": "string",
-                    "description": "Working directory to execute the command in (defaults to user home)"
-                },
-                "command": {
-                    "type": "string",
-                    "description": "Shell command to execute"
-                }
-            },
-            "required": ["command"]
-        }
+        return self._SCHEMA
 
     async def execute(self, arguments: dict) -> List[types.TextContent]:
         command = arguments.get("command")
@@ -159,98 +271,145 @@ Example responses:
             raise ValueError("Missing command parameter")
 
         shell = arguments.get("shell", "bash")
-        working_dir = arguments.get("working_dir", str(pathlib.Path.home()))
+        capture_output = arguments.get("capture_output", True)
+        working_dir = str(arguments.get("working_dir") or _DEFAULT_CWD)
 
         # Verify working directory exists
-        if working_dir and not os.path.exists(working_dir):
+        if not _dir_exists(working_dir):
             raise ValueError(f"Working directory does not exist: {working_dir}")
 
+        # Resolve the shell once per name so the child does not search PATH on every exec
+        shell_path = self._SHELL_PATHS.get(shell)
+        if shell_path is None:
+            shell_path = shutil.which(shell) or shell
+            self._SHELL_PATHS[shell] = shell_path
+
         # Create task
-        task = ShellTask(command, shell, working_dir)
+        self.prune_tasks()
+        task = ShellTask(command, shell_path, working_dir, capture_output)
         self.tasks[task.id] = task
-        logger.info(f"Created task {task.id} for command: {command}")
-
-        try:
-            # Try to execute synchronously with timeout
-            result = await asyncio.wait_for(
-                self._execute_task(task.id),
-                timeout=self.SYNC_TIMEOUT
-            )
-
-            # If we get here, command completed within timeout
-            output_text = ""
-            if result.stdout:
-                output_text += f"Standard Output:\n{result.stdout}\n"
-            if result.stderr:
-                output_text += f"Standard Error:\n{result.stderr}\n"
-            output_text += f"Execution time: {result.execution_time:.4f} seconds\n"
-            output_text += f"Return Value:\n{result.result}"
+        logger.info("Created task %s for command: %s", task.id, command)
 
-            return [types.TextContent(
-                type="text",
-                text=output_text
-            )]
+        # Run in the background from the start so a timeout only stops the wait
+        task.runner = asyncio.create_task(self._execute_task(task.id))
 
-        except asyncio.TimeoutError:
+        # Wait on the task directly: a single timer, and nothing to cancel on timeout
+        done, _ = await asyncio.wait({task.runner}, timeout=self.SYNC_TIMEOUT)
+        if not done:
             # Command is taking too long, switch to async mode
-            logger.info(f"Command taking longer than {self.SYNC_TIMEOUT}s, switching to async mode")
-
-            # Make sure the task continues running in the background
-            asyncio.create_task(self._execute_task(task.id))
+            logger.info("Command taking longer than %ss, switching to async mode", self.SYNC_TIMEOUT)
 
             return [types.TextContent(
                 type="text",
                 text=f"Task started with ID: {task.id}\nUse shell_status with this task ID to check progress."
             )]
 
-    async def _execute_task(self, task_id: str) -> CodeOutput:
+        # Command completed within timeout; output is appended as-is so large
+        # buffers are copied only once, by the final join
+        result = task.runner.result()
+        response = []
+        if result.stdout:
+            response += ("Standard Output:\n", result.stdout, "\n")
+        if result.stderr:
+            response += ("Standard Error:\n", result.stderr, "\n")
+        response.append(f"Execution time: {result.execution_time_str}\n")
+        response.append(f"Return Value:\n{result.result}")
+
+        return [types.TextContent(
+            type="text",
+            text="".join(response)
+        )]
+
+    def prune_tasks(self):
+        """Forget finished tasks whose results have been kept longer than TASK_RETENTION"""
+        now = time.monotonic()
+        expired = [
+            task_id for task_id, task in self.tasks.items()
+            if task.done_event.is_set()
+            and now - task.start_time - task.execution_time > self.TASK_RETENTION
+        ]
+        for task_id in expired:
+            del self.tasks[task_id]
+
+    @staticmethod
+    async def _spawn(shell: str, command: str, cwd: str, capture_output: bool = True) -> asyncio.subprocess.Process:
+        """Start command under shell with stdout/stderr piped back, or discarded if not captured"""
+        stream = asyncio.subprocess.PIPE if capture_output else asyncio.subprocess.DEVNULL
+        options = dict(
+            stdout=stream,
+            stderr=stream,
+            limit=READ_CHUNK,
+            cwd=cwd,
+            **SPAWN_OPTIONS,
+            # Own process group, so the whole command tree can be signalled together
+            start_new_session=True
+        )
+
+        # A bare program name runs directly, saving the intermediate shell process
+        if command not in _SHELL_KEYWORDS and not _SHELL_META.search(command):
+            try:
+                # Set PWD the way a shell would, or the program sees the server's directory
+                env = {**os.environ, "PWD": os.path.abspath(cwd)}
+                return await asyncio.create_subprocess_exec(command, env=env, **options)
+            except OSError:
+                pass  # Builtin, missing or not directly executable; let the shell decide
+
+        return await asyncio.create_subprocess_exec(shell, "-c", command, **options)
+
+    async def shutdown(self):
+        """Stop commands still running in the background"""
+        runners = [task.runner for task in self.tasks.values() if task.runner and not task.runner.done()]
+        for runner in runners:
+            runner.cancel()
+        await asyncio.gather(*runners, return_exceptions=True)
+
+    @contextlib.asynccontextmanager
+    async def _managed_process(self, task: ShellTask) -> AsyncIterator[asyncio.subprocess.Process]:
+        """Spawn the task's command and make sure it does not outlive an aborted run"""
+        process = await self._spawn(task.shell, task.command, task.working_dir, task.capture_output)
+        try:
+            yield process
+        finally:
+            if process.returncode is None:
+                await _terminate(process)
+
+    async def _execute_task(self, task_id: str) -> ShellTask:
+        """Run a task's command, recording its outcome on the task itself"""
         task = self.tasks[task_id]
-        output = CodeOutput()
         task.status = "running"
-        task.start_time = time.time()
+        task.start_time = time.monotonic()
 
         try:
-            logger.debug(f"Creating subprocess for task {task_id}")
-            task.process = await asyncio.create_subprocess_exec(
-                task.shell,
-                "-c",
-                task.command,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                cwd=task.working_dir
-            )
-
-            logger.info(f"Process created with PID: {task.process.pid}")
-
-            # Wait for the command to complete and capture output
-            stdout, stderr = await task.process.communicate()
-
-            # Store results
-            output.stdout = stdout.decode() if stdout else ""
-            output.stderr = stderr.decode() if stderr else ""
-            output.result = task.process.returncode
-
-            # Update task status
-            task.stdout = output.stdout
-            task.stderr = output.stderr
-            task.result = output.result
-            task.status = "completed"
-            task.execution_time = time.time() - task.start_time
-            output.execution_time = task.execution_time
-
-            logger.info(f"Task {task_id} completed with return code: {task.result}")
-            if output.stderr:
-                logger.warning(f"Task {task_id} stderr output: {output.stderr}")
+            async with self._managed_process(task) as process:
+                task.process = process
+                logger.info("Process created with PID: %s", process.pid)
+
+                # Read both pipes concurrently with bounded memory, then wait for exit
+                if task.capture_output:
+                    task.stdout, task.stderr = await asyncio.gather(
+                        _drain(process.stdout),
+                        _drain(process.stderr)
+                    )
+                task.result = await process.wait()
+
+            task.finish("completed")
+
+            logger.info("Task %s completed with return code: %s", task_id, task.result)
+            if task.stderr and logger.isEnabledFor(logging.DEBUG):
+                # stderr is routine for many commands and can be up to MAX_OUTPUT_BYTES
+                logger.debug("Task %s stderr output: %s", task_id, task.stderr)
+
+        except asyncio.CancelledError:
+            task.stderr = "Command cancelled"
+            task.result = -1
+            task.finish("failed")
+            raise
 
         except Exception as e:
             error_msg = f"Error executing command: {str(e)}"
             logger.error(error_msg, exc_info=True)
-            output.stderr = error_msg
             task.stderr = error_msg
-            task.status = "failed"
-            task.execution_time = time.time() - task.start_time
-            output.execution_time = task.execution_time
-            output.result = -1
             task.result = -1
+            task.finish("failed")
 
-        return output
+        return task